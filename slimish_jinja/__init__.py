@@ -1,3 +1,5 @@
 from .lexer import Lexer
 from .parse import Parser
+from .loader import SlimishLoader
 from .slimish_jinja import SlimishExtension
+from .translate import translate, translate_many, translate_parallel
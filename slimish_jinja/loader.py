@@ -0,0 +1,128 @@
+import hashlib
+import os
+import os.path
+import threading
+import time
+# Jinja imports.
+from jinja2 import FileSystemLoader
+
+
+class SlimishLoader(FileSystemLoader):
+    """
+    Filesystem loader which keeps slim templates fresh without calling
+    `stat` on every `get_template`.
+    A background thread scans the search path every `interval` seconds and
+    keeps an index of mtimes and content hashes of the templates with
+    `extensions` (`environment.file_extensions` if not given). Freshness
+    checks for those templates are dictionary lookups and a template is
+    reloaded, and so translated again, only when its content changes.
+    Changes are picked up within `interval` seconds. Other templates are
+    checked like `FileSystemLoader` does.
+    """
+    def __init__(self, searchpath, encoding='utf-8', followlinks=False,
+                 interval=2.0, extensions=None):
+        super(SlimishLoader, self).__init__(searchpath, encoding, followlinks)
+        self.__dict__.update(interval=interval, extensions=extensions,
+                             index={}, loaded=set(), thread=None, lock=threading.Lock(),
+                             stopped=threading.Event())
+        self.stats = {'scans': 0, 'last_scan_time': 0.0, 'total_scan_time': 0.0,
+                      'indexed': 0, 'changes': 0, 'loads': 0, 'reloads': 0}
+
+    def get_source(self, environment, template):
+        """
+        Returns the source of `template` and an `uptodate` callback which
+        compares content hashes from the index.
+        """
+        if self.thread is None:
+            self.start(environment)
+        entry = self.index.get(template)
+        if entry is None:
+            return super(SlimishLoader, self).get_source(environment, template)
+        filename = entry[0]
+        try:
+            with open(filename, 'rb') as f:
+                contents = f.read()
+        except IOError:
+            # Removed since the last scan.
+            return super(SlimishLoader, self).get_source(environment, template)
+        digest = hashlib.sha1(contents).hexdigest()
+        self.stats['reloads' if template in self.loaded else 'loads'] += 1
+        self.loaded.add(template)
+
+        def uptodate():
+            entry = self.index.get(template)
+            return entry is not None and entry[3] == digest
+        return contents.decode(self.encoding), os.path.normpath(filename), uptodate
+
+    def start(self, environment=None):
+        """
+        Builds the index and starts the background scanner.
+        """
+        with self.lock:
+            if self.thread is not None:
+                return
+            if self.extensions is None:
+                self.extensions = tuple(getattr(environment, 'file_extensions', ('.slim',)))
+            self.scan()
+            self.thread = threading.Thread(target=self.run, name='slimish-loader')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def close(self):
+        """
+        Stops the background scanner.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        """
+        Rescans the search path every `self.interval` seconds till closed.
+        """
+        while not self.stopped.wait(self.interval):
+            self.scan()
+
+    def scan(self):
+        """
+        Walks the search path and rebuilds the index. Files are read and
+        hashed only if their mtime or size changed since the last scan.
+        """
+        start = time.time()
+        old_index = self.index
+        index = {}
+        changes = 0
+        for searchpath in self.searchpath:
+            for dirpath, _, filenames in os.walk(searchpath, followlinks=self.followlinks):
+                for filename in filenames:
+                    if os.path.splitext(filename)[1] not in self.extensions:
+                        continue
+                    template = os.path.relpath(os.path.join(dirpath, filename), searchpath)
+                    template = template.replace(os.path.sep, '/')
+                    # Earlier search paths take precedence.
+                    if template in index:
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                        old = old_index.get(template)
+                        if old and old[:3] == (path, st.st_mtime, st.st_size):
+                            index[template] = old
+                            continue
+                        with open(path, 'rb') as f:
+                            digest = hashlib.sha1(f.read()).hexdigest()
+                    except (IOError, OSError):
+                        continue
+                    if old and old[3] != digest:
+                        changes += 1
+                    index[template] = (path, st.st_mtime, st.st_size, digest)
+        changes += len(set(old_index) - set(index))
+        # Swap the whole index so lookups never see a partial scan.
+        self.index = index
+        elapsed = time.time() - start
+        stats = self.stats
+        stats['scans'] += 1
+        stats['last_scan_time'] = elapsed
+        stats['total_scan_time'] += elapsed
+        stats['indexed'] = len(index)
+        stats['changes'] += changes
@@ -1,12 +1,10 @@
 from future import standard_library
 standard_library.install_aliases()
 import os.path
-from io import StringIO
 # Jinja imports.
 from jinja2.ext import Extension
 # Project imports.
-from .lexer import Lexer
-from .parse import Parser
+from .translate import translate, translate_parallel
 
 class SlimishExtension(Extension):
     """
@@ -19,6 +17,7 @@ class SlimishExtension(Extension):
         super(SlimishExtension, self).__init__(environment)
         environment.extend(
             slim_debug=True,
+            slim_parallel_threshold=None,
             file_extensions=('.slim',),
         )
 
@@ -26,10 +25,13 @@ class SlimishExtension(Extension):
         """
         Converts given slim template to jinja template.
         If `source` isn't slim, it's returned as is.
+        Templates larger than `slim_parallel_threshold` characters are
+        translated on a process pool. Parallel translation is off by default.
         """
         if not os.path.splitext(name)[1] in self.environment.file_extensions:
             return source
-        output = StringIO()
-        lexer = Lexer(iter(source.splitlines()))
-        Parser(lexer, callback=output.write, debug=self.environment.slim_debug).parse()
-        return output.getvalue()
+        debug = self.environment.slim_debug
+        threshold = self.environment.slim_parallel_threshold
+        if threshold is None:
+            return translate(source, debug)
+        return translate_parallel(source, debug, threshold=threshold)
@@ -0,0 +1,209 @@
+from builtins import range
+import hashlib
+import os
+import re
+from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+# Project imports.
+from .lexer import Lexer
+from .parse import Parser
+
+# Sources smaller than this (in characters) are always translated serially.
+PARALLEL_THRESHOLD = 1024 * 1024
+# Number of chunks handed to each worker. More chunks even out the load
+# when top level blocks differ a lot in size.
+CHUNKS_PER_WORKER = 4
+
+whitespace = re.compile(r'\s+')
+jinja_continuations = ('else', 'elif')
+
+
+def translate(source, debug=False):
+    """
+    Translates slim `source` to jinja serially and returns the output.
+    """
+    output = StringIO()
+    lexer = Lexer(iter(source.splitlines()))
+    Parser(lexer, callback=output.write, debug=debug).parse()
+    return output.getvalue()
+
+
+def translate_parallel(source, debug=False, threshold=PARALLEL_THRESHOLD,
+                       max_workers=None, executor=None):
+    """
+    Translates slim `source` to jinja, splitting it at top level block
+    boundaries and translating the chunks on a process pool.
+    The result is identical to `translate(source, debug)`. Sources shorter
+    than `threshold` characters are translated serially.
+    Pass `executor` to reuse an existing pool across calls.
+    """
+    if len(source) < threshold:
+        return translate(source, debug)
+    lines = source.splitlines()
+    workers = max_workers or os.cpu_count() or 1
+    chunk_size = max(1, len(lines) // (workers * CHUNKS_PER_WORKER))
+    boundaries = split_points(lines, chunk_size)
+    if len(boundaries) < 2:
+        return translate(source, debug)
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            output = translate_chunks(lines, boundaries, debug, executor)
+    else:
+        output = translate_chunks(lines, boundaries, debug, executor)
+    if output is None:
+        # Translate serially so the error is raised exactly as it would be
+        # without chunking.
+        return translate(source, debug)
+    return output
+
+
+def translate_chunks(lines, boundaries, debug, executor):
+    """
+    Translates `lines` split at `boundaries` on `executor` and joins the
+    output. Returns None if any chunk fails to translate.
+    """
+    ends = boundaries[1:] + [len(lines)]
+    jobs = [executor.submit(translate_chunk, lines[start:end], start, debug)
+            for start, end in zip(boundaries, ends)]
+    output = []
+    for job in jobs:
+        chunk_output, complete = job.result()
+        if chunk_output is None:
+            return None
+        output.append(chunk_output)
+        if not complete:
+            # The parser stopped before the end of the chunk. A serial
+            # run would have stopped there as well.
+            break
+    return ''.join(output)
+
+
+def translate_chunk(lines, start, debug):
+    """
+    Translates a chunk of lines beginning at line number `start`.
+    Returns `(output, complete)`. `output` is None if the chunk doesn't
+    translate and `complete` is False if the parser stopped before
+    consuming all tokens of the chunk.
+    """
+    output = StringIO()
+    lexer = Lexer(iter(lines))
+    lexer.lineno = start
+    parser = Parser(lexer, callback=output.write, debug=debug)
+    try:
+        parser.parse()
+    except Exception:
+        return None, False
+    try:
+        complete = next(parser.it, None) is None
+    except Exception:
+        # Lexer errors past the point the parser stopped at don't surface
+        # in a serial run either.
+        complete = False
+    return output.getvalue(), complete
+
+
+def translate_many(sources, debug=False, max_workers=None, executor=None):
+    """
+    Translates a batch of in-memory slim sources.
+    `sources` is a mapping (or an iterable of `(key, source)` pairs).
+    Identical sources are translated once, the unique ones are spread over
+    a process pool. Returns `(results, errors)` dictionaries mapping each
+    key to its jinja output or to the exception raised while translating it.
+    Pass `executor` to reuse an existing pool across calls.
+    """
+    if hasattr(sources, 'items'):
+        sources = sources.items()
+    keys_by_digest = {}
+    unique = {}
+    for key, source in sources:
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        keys_by_digest.setdefault(digest, []).append(key)
+        unique.setdefault(digest, source)
+    digests = list(unique)
+    jobs = [unique[digest] for digest in digests]
+    if len(jobs) < 2:
+        translated = [translate_safely(source, debug) for source in jobs]
+    elif executor is None:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            translated = map_sources(executor, jobs, debug, max_workers)
+    else:
+        translated = map_sources(executor, jobs, debug, max_workers)
+    results, errors = {}, {}
+    for digest, (output, error) in zip(digests, translated):
+        for key in keys_by_digest[digest]:
+            if error is None:
+                results[key] = output
+            else:
+                errors[key] = error
+    return results, errors
+
+
+def map_sources(executor, sources, debug, max_workers=None):
+    """
+    Translates `sources` on `executor` in batches to keep the number of
+    round trips to the workers low.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(sources) // (workers * CHUNKS_PER_WORKER))
+    return list(executor.map(translate_safely, sources, [debug] * len(sources),
+                             chunksize=chunksize))
+
+
+def translate_safely(source, debug):
+    """
+    Translates `source` and returns `(output, error)`.
+    """
+    try:
+        return translate(source, debug), None
+    except Exception as e:
+        return None, e
+
+
+def split_points(lines, chunk_size):
+    """
+    Returns indexes of `lines` at which the template can be split into
+    chunks of roughly `chunk_size` lines that translate independently.
+    Mirrors the indent tracking in `Lexer.__call__`. A split is only made
+    before an unindented line that starts a new top level block, i.e. not
+    inside a text block, not before a doctype and not before a jinja
+    `else`/`elif`.
+    """
+    points = [0]
+    indents = []
+    in_text_block = False
+    for idx in range(len(lines)):
+        line = lines[idx]
+        stripped_line = line.strip()
+        if not stripped_line or stripped_line[0] == '/':
+            continue
+        current_indent = whitespace.match(line)
+        indent_len = len(current_indent.group()) if current_indent else 0
+        if (not indents and indent_len) or (indents and indent_len > indents[-1]):
+            if not in_text_block:
+                indents.append(indent_len)
+        elif indents and indent_len < indents[-1]:
+            while indents and indents[-1] > indent_len:
+                indents.pop()
+            in_text_block = False
+        if in_text_block:
+            if not indents:
+                # Top level text block runs till the end of the template.
+                break
+            continue
+        if (not indents and not indent_len and idx - points[-1] >= chunk_size
+                and stripped_line[0] != '!' and not is_continuation(stripped_line)):
+            points.append(idx)
+        if stripped_line[0] == '|':
+            in_text_block = True
+    return points
+
+
+def is_continuation(line):
+    """
+    Checks if `line` continues the preceding jinja tag (`else`/`elif`).
+    """
+    if line[0] != '-':
+        return False
+    parts = whitespace.split(line)
+    tag_name = parts[1] if parts[0] == '-' and len(parts) > 1 else parts[0][1:]
+    return tag_name in jinja_continuations